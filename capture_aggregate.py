@@ -0,0 +1,151 @@
+import json
+import math
+from url_templates import normalise_url
+
+# Log-linear latency histogram: 16 buckets per doubling from 0.1 ms (~4% error)
+HISTOGRAM_MIN_MS = 0.1
+HISTOGRAM_SUB_BUCKETS = 16
+HISTOGRAM_MAX_BUCKET = HISTOGRAM_SUB_BUCKETS * 24
+
+OTHER_TEMPLATE = '{other}'
+
+def create_aggregator(allowlist=None, max_templates=1000):
+    """Create a streaming roll-up of requests by (method, URL template)"""
+    return {
+        'allowlist': list(allowlist or []),
+        'max_templates': max_templates,
+        'templates': {},
+        'aggregated': 0,
+        'unfinished': 0,
+        'kept': 0,
+    }
+
+def histogram_bucket(latency_ms):
+    """Get the histogram bucket index for a latency"""
+    if latency_ms <= HISTOGRAM_MIN_MS:
+        return 0
+    bucket = int(math.log2(latency_ms / HISTOGRAM_MIN_MS) * HISTOGRAM_SUB_BUCKETS)
+    return min(bucket, HISTOGRAM_MAX_BUCKET)
+
+def bucket_latency(bucket):
+    """Get the representative latency of a histogram bucket"""
+    return HISTOGRAM_MIN_MS * 2 ** ((bucket + 0.5) / HISTOGRAM_SUB_BUCKETS)
+
+def histogram_percentile(histogram, count, percentile):
+    """Read a percentile from a bucketed latency histogram"""
+    if not count:
+        return None
+    target = max(1, math.ceil(count * percentile / 100.0))
+    seen = 0
+    for bucket in sorted(histogram):
+        seen += histogram[bucket]
+        if seen >= target:
+            return bucket_latency(bucket)
+    return bucket_latency(max(histogram))
+
+def is_full_record_url(aggregator, url):
+    """Check if requests to this URL are kept in full instead of rolled up"""
+    if not aggregator['allowlist']:
+        return False
+    template = normalise_url(url)
+    return any(
+        pattern in template or pattern in url
+        for pattern in aggregator['allowlist']
+    )
+
+def get_template_stats(aggregator, method, template):
+    """Get the stats entry for a template, folding new ones into {other} past the cap"""
+    templates = aggregator['templates']
+    key = (method, template)
+    stats = templates.get(key)
+    if stats is None:
+        if len(templates) >= aggregator['max_templates']:
+            key = ('*', OTHER_TEMPLATE)
+            stats = templates.get(key)
+        if stats is None:
+            stats = templates[key] = {
+                'count': 0,
+                'failed': 0,
+                'unfinished': 0,
+                'bytes': 0,
+                'timed': 0,
+                'latency_sum_ms': 0.0,
+                'latency_max_ms': 0.0,
+                'histogram': {},
+            }
+    return stats
+
+def aggregate_record(aggregator, record):
+    """Roll a completed timing record into its template, returning False if it should be kept in full"""
+    url = record.get('url', '')
+    if is_full_record_url(aggregator, url):
+        aggregator['kept'] += 1
+        return False
+
+    stats = get_template_stats(aggregator, record.get('method', ''), normalise_url(url))
+    stats['count'] += 1
+    stats['bytes'] += record.get('bytes') or 0
+    if record.get('failed'):
+        stats['failed'] += 1
+    if record.get('end') is None:
+        # Evicted before a terminal event, so counted without a latency
+        stats['unfinished'] += 1
+        aggregator['unfinished'] += 1
+    elif record.get('start') is not None:
+        latency_ms = max(0.0, (record['end'] - record['start']) * 1000)
+        stats['timed'] += 1
+        stats['latency_sum_ms'] += latency_ms
+        stats['latency_max_ms'] = max(stats['latency_max_ms'], latency_ms)
+        bucket = histogram_bucket(latency_ms)
+        stats['histogram'][bucket] = stats['histogram'].get(bucket, 0) + 1
+    aggregator['aggregated'] += 1
+    return True
+
+def get_aggregate_summary(aggregator):
+    """Build a compact summary whose size depends on templates, not requests"""
+    templates = []
+    for (method, template), stats in aggregator['templates'].items():
+        timed = stats['timed']
+        entry = {
+            'method': method,
+            'template': template,
+            'count': stats['count'],
+            'failed': stats['failed'],
+            'unfinished': stats['unfinished'],
+            'bytes': stats['bytes'],
+            'mean_ms': round(stats['latency_sum_ms'] / timed, 1) if timed else None,
+            'max_ms': round(stats['latency_max_ms'], 1) if timed else None,
+        }
+        for p in (50, 90, 99):
+            value = histogram_percentile(stats['histogram'], timed, p)
+            entry[f"p{p}_ms"] = round(value, 1) if value is not None else None
+        templates.append(entry)
+    templates.sort(key=lambda entry: entry['count'], reverse=True)
+    return {
+        'aggregated': aggregator['aggregated'],
+        'unfinished': aggregator['unfinished'],
+        'kept': aggregator['kept'],
+        'templates': templates,
+    }
+
+def format_aggregate_summary(summary, top=10):
+    """Format the busiest templates as a text report"""
+    lines = [
+        f"Aggregated: {summary['aggregated']} ({summary['unfinished']} unfinished)  "
+        f"Kept in full: {summary['kept']}"
+    ]
+    for entry in summary['templates'][:top]:
+        lines.append(
+            f"{entry['count']:>7} x {entry['method']} {entry['template'][:80]} "
+            f"p50={entry['p50_ms']} p99={entry['p99_ms']} ms bytes={entry['bytes']}"
+        )
+    return "\n".join(lines)
+
+def write_aggregate_summary(aggregator, summary_file):
+    """Write the aggregate summary as JSON"""
+    try:
+        with open(summary_file, 'w', encoding='utf-8') as f:
+            json.dump(get_aggregate_summary(aggregator), f, indent=2)
+        print(f"Aggregate summary saved to: {summary_file}")
+    except Exception as e:
+        print(f"Error saving aggregate summary: {str(e)}")
@@ -0,0 +1,128 @@
+import os
+from collections import deque
+
+OVERFLOW_POLICIES = ('block', 'drop-oldest', 'sample')
+
+def validate_capture_settings(max_size, policy):
+    """Raise ValueError for an unusable buffer size or overflow policy"""
+    if policy not in OVERFLOW_POLICIES:
+        raise ValueError(f"Unknown overflow policy: {policy}")
+    if max_size < 1:
+        raise ValueError("Capture buffer size must be at least 1")
+
+def load_capture_settings():
+    """Read and validate capture buffer settings from environment variables"""
+    settings = {
+        'queue_size': int(os.getenv('CAPTURE_QUEUE_SIZE', '1000')),
+        'policy': os.getenv('CAPTURE_OVERFLOW_POLICY', 'block'),
+        'sample_rate': int(os.getenv('CAPTURE_SAMPLE_RATE', '10')),
+        'pending_max': int(os.getenv('PENDING_RECORDS_MAX', '5000')),
+        'drain_interval': float(os.getenv('CAPTURE_DRAIN_INTERVAL', '2.0')),
+    }
+    # Fail at import time, before a browser has been started
+    validate_capture_settings(settings['queue_size'], settings['policy'])
+    if settings['pending_max'] < 1:
+        raise ValueError("Pending records size must be at least 1")
+    if settings['drain_interval'] <= 0:
+        raise ValueError("Capture drain interval must be greater than 0")
+    return settings
+
+def create_capture_buffer(max_size=1000, policy='block', sample_rate=10, watch_patterns=None):
+    """Create a bounded buffer between performance log capture and the log sink"""
+    validate_capture_settings(max_size, policy)
+
+    return {
+        'queue': deque(),
+        # Watched requests since the last drain; already written to the sink
+        'recent_watched': [],
+        'watched': 0,
+        'max_size': max_size,
+        'policy': policy,
+        'sample_rate': max(1, sample_rate),
+        'watch_patterns': list(watch_patterns or []),
+        'seen': 0,
+        'unmatched_seen': 0,
+        'dropped': 0,
+        'sampled_out': 0,
+        'aggregated': 0,
+        'flushes': 0,
+    }
+
+def is_watched_request(buffer, request):
+    """Check if request URL matches one of the watched patterns"""
+    url = request.get('url', '')
+    return any(pattern in url for pattern in buffer['watch_patterns'])
+
+def flush_capture_buffer(buffer, sink):
+    """Write all queued requests to the sink and release them from memory"""
+    if not buffer['queue']:
+        return 0
+    batch = list(buffer['queue'])
+    buffer['queue'].clear()
+    sink(batch)
+    buffer['flushes'] += 1
+    return len(batch)
+
+def enqueue_request(buffer, request, sink):
+    """Add request to the buffer, applying the overflow policy when full"""
+    buffer['seen'] += 1
+
+    # Watched requests bypass the queue so they can never be evicted
+    if is_watched_request(buffer, request):
+        buffer['watched'] += 1
+        buffer['recent_watched'].append(request)
+        sink([request])
+        return True
+
+    buffer['unmatched_seen'] += 1
+    if buffer['policy'] == 'sample' and (buffer['unmatched_seen'] - 1) % buffer['sample_rate']:
+        buffer['sampled_out'] += 1
+        return False
+
+    queue = buffer['queue']
+    if len(queue) >= buffer['max_size']:
+        if buffer['policy'] == 'block':
+            # Capture waits for the sink to catch up instead of growing the queue
+            flush_capture_buffer(buffer, sink)
+        else:
+            queue.popleft()
+            buffer['dropped'] += 1
+
+    queue.append(request)
+    return True
+
+def count_aggregated_request(buffer):
+    """Count a request that is rolled up into a template instead of queued"""
+    buffer['seen'] += 1
+    buffer['aggregated'] += 1
+
+def drain_capture_buffer(buffer, sink):
+    """Flush queued requests to the sink and return them with watched requests since the last drain"""
+    batch = buffer['recent_watched'] + list(buffer['queue'])
+    buffer['recent_watched'] = []
+    flush_capture_buffer(buffer, sink)
+    return batch
+
+def get_capture_stats(buffer):
+    """Get drop and throughput counters for the buffer"""
+    return {
+        'seen': buffer['seen'],
+        'watched': buffer['watched'],
+        'queued': len(buffer['queue']),
+        'dropped': buffer['dropped'],
+        'sampled_out': buffer['sampled_out'],
+        'aggregated': buffer['aggregated'],
+        'flushes': buffer['flushes'],
+    }
+
+def print_capture_stats(buffer, pending=None):
+    """Print capture buffer counters, plus in-flight record evictions if given"""
+    stats = get_capture_stats(buffer)
+    line = (
+        f"Capture stats: seen={stats['seen']} watched={stats['watched']} "
+        f"dropped={stats['dropped']} sampled_out={stats['sampled_out']} "
+        f"aggregated={stats['aggregated']} flushes={stats['flushes']}"
+    )
+    if pending is not None:
+        line += f" pending_evicted={pending['evicted']}"
+    print(line)
@@ -0,0 +1,203 @@
+# Description: Compare two network captures and report endpoint, header and latency changes
+# Usage: python capture_diff.py <old_network_log.txt> <new_network_log.txt> [diff.json]
+# Note: Timing records (*_records_*.jsonl) next to each log are used for latency deltas if present
+# Note: Extra per-session headers to ignore can be set as CAPTURE_DIFF_VOLATILE_HEADERS=a,b
+
+import hashlib
+import json
+import os
+import statistics
+import sys
+from capture_records import load_capture_records, get_records_filepath
+from url_templates import normalise_url
+
+# A template counts as slower only if both thresholds are crossed
+REGRESSION_MIN_DELTA_MS = 100
+REGRESSION_MIN_RATIO = 1.2
+
+# Per-session headers whose values change on every run; only added/removed names are reported
+VOLATILE_HEADERS = {
+    'cookie', 'authorization', 'date', 'if-none-match', 'if-modified-since',
+    'traceparent', 'tracestate', 'request-id', 'client-request-id',
+    'x-request-id', 'x-correlation-id', 'x-client-trace-id', 'x-ms-client-request-id',
+    'x-csrf-token', 'x-xsrf-token', 'x-owa-correlationid', 'x-owa-sessionid',
+}
+
+def get_volatile_headers():
+    """Get the default volatile headers plus any configured in the environment"""
+    extra = os.getenv('CAPTURE_DIFF_VOLATILE_HEADERS', '')
+    return VOLATILE_HEADERS | {h.strip().lower() for h in extra.split(',') if h.strip()}
+
+def hash_value(value):
+    """Short stable hash used for request signatures and header values"""
+    return hashlib.blake2b(value.encode('utf-8'), digest_size=8).hexdigest()
+
+def load_text_log(log_file):
+    """Parse a network log written by log_network_request or log_request"""
+    requests = []
+    current = None
+    in_headers = False
+    with open(log_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.rstrip('\n')
+            if len(line) >= 10 and set(line) == {'='}:
+                # Separators open and close each request block
+                if current is None:
+                    current = {'url': '', 'method': '', 'headers': {}}
+                    in_headers = False
+                else:
+                    requests.append(current)
+                    current = None
+                continue
+            if current is None:
+                continue
+            if in_headers:
+                key, sep, value = line.partition(': ')
+                if sep:
+                    current['headers'][key] = value
+            elif line.startswith('URL: '):
+                current['url'] = line[5:]
+            elif line.startswith('Method: '):
+                current['method'] = line[8:]
+            elif line == 'Headers:':
+                in_headers = True
+    return requests
+
+def build_capture_index(requests, records=None):
+    """Index a capture by (method, template) in a single pass"""
+    index = {}
+    templates = {}
+
+    def get_template(url):
+        # Repeated URLs (and the matching timing records) are only normalised once
+        template = templates.get(url)
+        if template is None:
+            template = templates[url] = normalise_url(url)
+        return template
+
+    for request in requests:
+        key = (request.get('method', ''), get_template(request.get('url', '')))
+        entry = index.get(key)
+        if entry is None:
+            entry = index[key] = {
+                'count': 0,
+                'signatures': set(),
+                'headers': {},
+                'latencies': [],
+                'example': request.get('url', ''),
+            }
+        entry['count'] += 1
+        headers = request.get('headers', {})
+        names = sorted(headers)
+        entry['signatures'].add(hash_value(f"{key[0]} {key[1]} {','.join(names)}"))
+        for name in names:
+            value_hash = hash_value(str(headers[name]))
+            # None marks a header whose value varies within the run
+            previous = entry['headers'].get(name, value_hash)
+            entry['headers'][name] = value_hash if previous == value_hash else None
+
+    for record in records or []:
+        if record.get('start') is None or record.get('end') is None:
+            continue
+        key = (record.get('method', ''), get_template(record.get('url', '')))
+        entry = index.get(key)
+        if entry is not None:
+            entry['latencies'].append((record['end'] - record['start']) * 1000)
+    return index
+
+def diff_captures(old_index, new_index, volatile_headers=None):
+    """Compare two capture indexes and report added, removed, changed and slower endpoints"""
+    if volatile_headers is None:
+        volatile_headers = get_volatile_headers()
+    added = sorted(set(new_index) - set(old_index))
+    removed = sorted(set(old_index) - set(new_index))
+    changed = []
+    slower = []
+
+    for key in sorted(set(old_index) & set(new_index)):
+        old = old_index[key]
+        new = new_index[key]
+
+        headers_added = []
+        headers_removed = []
+        # Equal signature sets mean the same header names, so only values need checking
+        if old['signatures'] != new['signatures']:
+            headers_added = sorted(set(new['headers']) - set(old['headers']))
+            headers_removed = sorted(set(old['headers']) - set(new['headers']))
+        values_changed = sorted(
+            name for name, value in old['headers'].items()
+            if value and new['headers'].get(name) and new['headers'][name] != value
+            and name.lower() not in volatile_headers
+        )
+        if headers_added or headers_removed or values_changed:
+            changed.append({
+                'method': key[0],
+                'template': key[1],
+                'headers_added': headers_added,
+                'headers_removed': headers_removed,
+                'values_changed': values_changed,
+            })
+
+        if old['latencies'] and new['latencies']:
+            old_ms = statistics.median(old['latencies'])
+            new_ms = statistics.median(new['latencies'])
+            delta = new_ms - old_ms
+            if delta >= REGRESSION_MIN_DELTA_MS and new_ms >= old_ms * REGRESSION_MIN_RATIO:
+                slower.append({
+                    'method': key[0],
+                    'template': key[1],
+                    'old_median_ms': round(old_ms, 1),
+                    'new_median_ms': round(new_ms, 1),
+                    'delta_ms': round(delta, 1),
+                })
+
+    slower.sort(key=lambda item: item['delta_ms'], reverse=True)
+    return {
+        'added': [{'method': m, 'template': t, 'example': new_index[(m, t)]['example']} for m, t in added],
+        'removed': [{'method': m, 'template': t, 'example': old_index[(m, t)]['example']} for m, t in removed],
+        'changed': changed,
+        'slower': slower,
+    }
+
+def load_capture_index(log_file):
+    """Load a text log and its timing records, if any, into a capture index"""
+    records_file = get_records_filepath(log_file)
+    records = load_capture_records(records_file) if os.path.exists(records_file) else None
+    return build_capture_index(load_text_log(log_file), records)
+
+def format_capture_diff(diff):
+    """Format a capture diff as a text report"""
+    lines = [
+        f"Added: {len(diff['added'])}  Removed: {len(diff['removed'])}  "
+        f"Changed: {len(diff['changed'])}  Slower: {len(diff['slower'])}"
+    ]
+    for item in diff['added']:
+        lines.append(f"+ {item['method']} {item['template']}")
+    for item in diff['removed']:
+        lines.append(f"- {item['method']} {item['template']}")
+    for item in diff['changed']:
+        details = []
+        if item['headers_added']:
+            details.append(f"added headers: {', '.join(item['headers_added'])}")
+        if item['headers_removed']:
+            details.append(f"removed headers: {', '.join(item['headers_removed'])}")
+        if item['values_changed']:
+            details.append(f"changed values: {', '.join(item['values_changed'])}")
+        lines.append(f"~ {item['method']} {item['template']} ({'; '.join(details)})")
+    for item in diff['slower']:
+        lines.append(
+            f"! {item['method']} {item['template']} "
+            f"{item['old_median_ms']} -> {item['new_median_ms']} ms (+{item['delta_ms']} ms)"
+        )
+    return "\n".join(lines)
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("Usage: python capture_diff.py <old_network_log.txt> <new_network_log.txt> [diff.json]")
+        sys.exit(1)
+    diff = diff_captures(load_capture_index(sys.argv[1]), load_capture_index(sys.argv[2]))
+    print(format_capture_diff(diff))
+    if len(sys.argv) > 3:
+        with open(sys.argv[3], 'w', encoding='utf-8') as f:
+            json.dump(diff, f, indent=2)
+        print(f"Diff saved to: {sys.argv[3]}")
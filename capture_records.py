@@ -0,0 +1,104 @@
+import json
+import os
+from collections import OrderedDict
+from urllib.parse import urlsplit
+from url_templates import normalise_url
+
+def get_records_filepath(log_file):
+    """Get filepath for timing records next to a network log file"""
+    base = os.path.splitext(log_file)[0]
+    return base.replace('network_logs_', 'network_records_') + '.jsonl'
+
+def create_pending_records(max_size=5000):
+    """Create the bounded table of in-flight requests awaiting a terminal event"""
+    if max_size < 1:
+        raise ValueError("Pending records size must be at least 1")
+    return {'records': OrderedDict(), 'max_size': max_size, 'evicted': 0, 'recent_evicted': []}
+
+def take_evicted_records(pending):
+    """Return records evicted since the last call so they can still be counted"""
+    evicted = pending['recent_evicted']
+    pending['recent_evicted'] = []
+    return evicted
+
+def create_capture_record(params):
+    """Create a timing record from Network.requestWillBeSent params"""
+    request = params.get('request', {})
+    url = request.get('url', '')
+    parts = urlsplit(url)
+    return {
+        'kind': 'request',
+        'request_id': params.get('requestId'),
+        'url': url,
+        'method': request.get('method', ''),
+        'host': parts.netloc,
+        'endpoint': normalise_url(url),
+        'type': params.get('type', ''),
+        'initiator': params.get('initiator', {}).get('url', ''),
+        'start': params.get('timestamp'),
+        'response': None,
+        'end': None,
+        'status': None,
+        'bytes': 0,
+        'failed': False,
+    }
+
+def update_capture_records(pending, data):
+    """Correlate a CDP network event with in-flight records, returning the completed record if any"""
+    records = pending['records']
+    method = data.get('method')
+    params = data.get('params', {})
+    request_id = params.get('requestId')
+
+    if method == 'Network.requestWillBeSent':
+        completed = None
+        # Redirects reuse the request id, so close out the previous hop first
+        previous = records.pop(request_id, None)
+        if previous and params.get('redirectResponse'):
+            previous['end'] = params.get('timestamp')
+            previous['status'] = params['redirectResponse'].get('status')
+            completed = previous
+        records[request_id] = create_capture_record(params)
+        # Long-polls, streams and dropped events never finish, so evict the oldest
+        while len(records) > pending['max_size']:
+            pending['recent_evicted'].append(records.popitem(last=False)[1])
+            pending['evicted'] += 1
+        return completed
+
+    record = records.get(request_id)
+    if record is None:
+        return None
+
+    if method == 'Network.responseReceived':
+        record['response'] = params.get('timestamp')
+        record['status'] = params.get('response', {}).get('status')
+    elif method == 'Network.loadingFinished':
+        record['end'] = params.get('timestamp')
+        record['bytes'] = params.get('encodedDataLength', 0)
+        return records.pop(request_id)
+    elif method == 'Network.loadingFailed':
+        record['end'] = params.get('timestamp')
+        record['failed'] = True
+        return records.pop(request_id)
+    return None
+
+def save_capture_records(records, records_file):
+    """Append completed timing records to a JSON lines file"""
+    if not records:
+        return
+    try:
+        lines = ''.join(json.dumps(record) + "\n" for record in records)
+        with open(records_file, 'a', encoding='utf-8') as f:
+            f.write(lines)
+    except Exception as e:
+        print(f"Error saving capture records: {str(e)}")
+
+def load_capture_records(records_file):
+    """Load timing records from a JSON lines file"""
+    records = []
+    with open(records_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                records.append(json.loads(line))
+    return records
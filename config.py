@@ -1,6 +1,7 @@
 import random
 from dotenv import load_dotenv
 import os
+from capture_buffer import load_capture_settings
 
 load_dotenv()
 
@@ -9,6 +10,31 @@ URLS = {
     'people': 'https://outlook.office.com/people/'
 }
 
+# Capture buffering between the performance log and the log file sink
+# Policies: 'block', 'drop-oldest', 'sample'
+_capture_settings = load_capture_settings()
+CAPTURE_QUEUE_SIZE = _capture_settings['queue_size']
+CAPTURE_OVERFLOW_POLICY = _capture_settings['policy']
+CAPTURE_SAMPLE_RATE = _capture_settings['sample_rate']
+# In-flight requests tracked for timing before the oldest are evicted
+PENDING_RECORDS_MAX = _capture_settings['pending_max']
+# Seconds between performance log drains while the session is waiting
+CAPTURE_DRAIN_INTERVAL = _capture_settings['drain_interval']
+# Requests matching these URL fragments are never dropped or sampled out
+WATCHED_URL_PATTERNS = ['linkedin/profiles/full']
+
+# Optional browser resource sampling via CDP Performance.getMetrics
+PERF_SAMPLING_ENABLED = os.getenv('PERF_SAMPLING_ENABLED', 'false').lower() == 'true'
+PERF_SAMPLE_INTERVAL = float(os.getenv('PERF_SAMPLE_INTERVAL', '1.0'))
+if PERF_SAMPLING_ENABLED and PERF_SAMPLE_INTERVAL <= 0:
+    raise ValueError("PERF_SAMPLE_INTERVAL must be greater than 0")
+
+# Aggregation mode rolls repetitive requests up into counted URL templates
+AGGREGATION_ENABLED = os.getenv('AGGREGATION_ENABLED', 'false').lower() == 'true'
+AGGREGATE_MAX_TEMPLATES = int(os.getenv('AGGREGATE_MAX_TEMPLATES', '1000'))
+# Templates matching these fragments keep full records in aggregation mode
+AGGREGATE_FULL_RECORD_PATTERNS = []
+
 FIRST_NAMES = ['John', 'Jane', 'Michael', 'Emily', 'David', 'Sarah', 'Robert', 'Lisa']
 LAST_NAMES = ['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis']
 
@@ -5,11 +5,35 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 import time
-from config import URLS, generate_random_name, CONTACT_EMAIL, OUTLOOK_EMAIL, OUTLOOK_PASSWORD
+from config import (
+    URLS, generate_random_name, CONTACT_EMAIL, OUTLOOK_EMAIL, OUTLOOK_PASSWORD,
+    CAPTURE_QUEUE_SIZE, CAPTURE_OVERFLOW_POLICY, CAPTURE_SAMPLE_RATE, WATCHED_URL_PATTERNS,
+    PENDING_RECORDS_MAX, CAPTURE_DRAIN_INTERVAL,
+    PERF_SAMPLING_ENABLED, PERF_SAMPLE_INTERVAL,
+    AGGREGATION_ENABLED, AGGREGATE_FULL_RECORD_PATTERNS, AGGREGATE_MAX_TEMPLATES
+)
+from capture_buffer import (
+    create_capture_buffer, enqueue_request, drain_capture_buffer, get_capture_stats,
+    count_aggregated_request, print_capture_stats
+)
+from capture_records import (
+    create_pending_records, update_capture_records, take_evicted_records, save_capture_records,
+    load_capture_records, get_records_filepath
+)
+from capture_aggregate import (
+    create_aggregator, aggregate_record, is_full_record_url,
+    get_aggregate_summary, format_aggregate_summary, write_aggregate_summary
+)
+from performance_sampler import (
+    start_performance_sampler, stop_performance_sampler,
+    sample_performance_if_due, get_next_sample_time
+)
+from network_analysis import compute_timing_summary, format_timing_report, write_timing_summary
 import csv
 from datetime import datetime
 import os
 import json
+from collections import deque
 
 def get_log_filepath():
     """Get filepath for the network log file"""
@@ -19,19 +43,29 @@ def get_log_filepath():
 
 def log_network_request(request_data, log_file):
     """Log network request to file"""
+    log_network_requests([request_data], log_file)
+
+def log_network_requests(requests, log_file):
+    """Log a batch of network requests to file with a single open"""
     try:
+        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         with open(log_file, 'a', encoding='utf-8') as f:
-            f.write(f"\n{'='*50}\n")
-            f.write(f"Timestamp: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-            f.write(f"URL: {request_data.get('url', 'N/A')}\n")
-            f.write(f"Method: {request_data.get('method', 'N/A')}\n")
-            f.write("Headers:\n")
-            for k, v in request_data.get('headers', {}).items():
-                f.write(f"{k}: {v}\n")
-            f.write(f"{'='*50}\n")
+            for request_data in requests:
+                f.write(f"\n{'='*50}\n")
+                f.write(f"Timestamp: {timestamp}\n")
+                f.write(f"URL: {request_data.get('url', 'N/A')}\n")
+                f.write(f"Method: {request_data.get('method', 'N/A')}\n")
+                f.write("Headers:\n")
+                for k, v in request_data.get('headers', {}).items():
+                    f.write(f"{k}: {v}\n")
+                f.write(f"{'='*50}\n")
     except Exception as e:
         print(f"Error logging request: {str(e)}")
 
+def get_log_sink(driver):
+    """Get the sink that writes buffered requests to the network log file"""
+    return lambda batch: log_network_requests(batch, driver.network_log_file)
+
 def setup_chrome_driver():
     """Setup Chrome with network monitoring"""
     chrome_options = Options()
@@ -47,47 +81,115 @@ def setup_chrome_driver():
     chrome_options.set_capability(
         "goog:loggingPrefs", {"performance": "ALL", "browser": "ALL"}
     )
+    # Only network events are read back, so keep Page events out of chromedriver's log buffer
+    chrome_options.add_experimental_option(
+        'perfLoggingPrefs', {'enableNetwork': True, 'enablePage': False}
+    )
     
+    driver = None
     try:
         service = Service('/usr/lib/chromium-browser/chromedriver')
         driver = webdriver.Chrome(service=service, options=chrome_options)
         
         driver.set_page_load_timeout(30)
-        driver.captured_requests = []
+        driver.captured_requests = deque(maxlen=CAPTURE_QUEUE_SIZE)
         driver.network_log_file = get_log_filepath()
+        driver.network_records_file = get_records_filepath(driver.network_log_file)
+        driver.pending_records = create_pending_records(PENDING_RECORDS_MAX)
+        # Watched URLs are always kept in full, even when polling traffic is rolled up
+        driver.aggregator = create_aggregator(
+            allowlist=AGGREGATE_FULL_RECORD_PATTERNS + WATCHED_URL_PATTERNS,
+            max_templates=AGGREGATE_MAX_TEMPLATES
+        ) if AGGREGATION_ENABLED else None
+        driver.capture_buffer = create_capture_buffer(
+            max_size=CAPTURE_QUEUE_SIZE,
+            policy=CAPTURE_OVERFLOW_POLICY,
+            sample_rate=CAPTURE_SAMPLE_RATE,
+            watch_patterns=WATCHED_URL_PATTERNS
+        )
         
         driver.execute_cdp_cmd('Network.enable', {})
         driver.execute_cdp_cmd('Page.enable', {})
         
+        # Resource samples share the records file so they line up with request timings
+        if PERF_SAMPLING_ENABLED:
+            start_performance_sampler(driver, driver.network_records_file, PERF_SAMPLE_INTERVAL)
+        
         print(f"Network logs will be saved to: {driver.network_log_file}")
         return driver
         
     except Exception as e:
         print(f"Failed to initialize ChromeDriver: {str(e)}")
+        # Don't leave Chrome and chromedriver running if setup fails after launch
+        if driver:
+            try:
+                driver.quit()
+            except:
+                pass
         raise
 
-def get_performance_logs(driver):
+def handle_network_event(driver, data, sink, completed):
+    """Correlate timings for a CDP event and route new requests to the capture buffer"""
+    record = update_capture_records(driver.pending_records, data)
+    if record and not (driver.aggregator and aggregate_record(driver.aggregator, record)):
+        completed.append(record)
+    # Rolled-up requests evicted before finishing still count towards their template
+    for evicted in take_evicted_records(driver.pending_records):
+        if driver.aggregator:
+            aggregate_record(driver.aggregator, evicted)
+    if (
+        'Network.requestWillBeSent' == data['method']
+        and data.get('params', {}).get('request')
+    ):
+        request = data['params']['request']
+        # Requests on rolled-up templates are only counted, not logged in full
+        if driver.aggregator is None or is_full_record_url(driver.aggregator, request.get('url', '')):
+            enqueue_request(driver.capture_buffer, request, sink)
+        else:
+            count_aggregated_request(driver.capture_buffer)
+        return request
+    return None
+
+def get_performance_logs(driver, verbose=True):
     """Extract network requests from performance logs"""
     try:
-        logs = driver.get_log('performance')
-        for entry in logs:
+        sink = get_log_sink(driver)
+        completed = []
+        for entry in driver.get_log('performance'):
             try:
                 data = json.loads(entry['message'])['message']
-                if (
-                    'Network.requestWillBeSent' == data['method']
-                    and data.get('params', {}).get('request')
-                ):
-                    request = data['params']['request']
-                    log_network_request(request, driver.network_log_file)
-                    
-                    if 'linkedin/profiles/full' in request.get('url', ''):
-                        print(f"\nCaptured LinkedIn request: {request['url']}")
-                        driver.captured_requests.append(request)
+                request = handle_network_event(driver, data, sink, completed)
+                if request and 'linkedin/profiles/full' in request.get('url', ''):
+                    print(f"\nCaptured LinkedIn request: {request['url']}")
+                    driver.captured_requests.append(request)
             except:
                 continue
+        drain_capture_buffer(driver.capture_buffer, sink)
+        save_capture_records(completed, driver.network_records_file)
+        if verbose:
+            print_capture_stats(driver.capture_buffer, driver.pending_records)
     except Exception as e:
         print(f"Error getting performance logs: {str(e)}")
 
+def wait_and_capture(driver, seconds):
+    """Sleep while draining the performance log and taking due resource samples"""
+    # Regular drains keep chromedriver's log buffer and each get_log batch small
+    deadline = time.monotonic() + seconds
+    next_drain = time.monotonic() + CAPTURE_DRAIN_INTERVAL
+    while True:
+        now = time.monotonic()
+        if now >= deadline:
+            break
+        wake = min(deadline, next_drain)
+        next_sample = get_next_sample_time(driver)
+        if next_sample is not None:
+            wake = min(wake, next_sample)
+        time.sleep(max(0.0, wake - now))
+        if time.monotonic() >= next_drain or time.monotonic() >= deadline:
+            get_performance_logs(driver, verbose=False)
+            next_drain = time.monotonic() + CAPTURE_DRAIN_INTERVAL
+        sample_performance_if_due(driver)
+
 def capture_linkedin_request(driver, timeout=30):
     """Capture LinkedIn API request headers"""
     try:
@@ -185,20 +287,20 @@ def enter_password(driver, password):
             EC.presence_of_element_located((By.NAME, "passwd"))
         )
         
-        time.sleep(2.5)
+        wait_and_capture(driver, 2.5)
         
         password_input.clear()
         for char in password:
             password_input.send_keys(char)
             time.sleep(0.5)
         
-        time.sleep(2)
+        wait_and_capture(driver, 2)
         
         sign_in_button = driver.find_element(By.ID, "idSIButton9")
         sign_in_button.click()
         print("Sign in button clicked")
         
-        time.sleep(3.5)
+        wait_and_capture(driver, 3.5)
         return True
         
     except Exception as e:
@@ -217,11 +319,11 @@ def handle_stay_signed_in(driver):
             EC.element_to_be_clickable((By.CSS_SELECTOR, 'button[type="submit"][aria-label="Yes"][id="acceptButton"]'))
         )
         
-        time.sleep(2)
+        wait_and_capture(driver, 2)
         yes_button.click()
         print("Clicked 'Yes' on stay signed in dialog")
         
-        time.sleep(3)
+        wait_and_capture(driver, 3)
         return True
         
     except Exception as e:
@@ -254,11 +356,11 @@ def create_new_contact(driver):
                 'button[data-automation-type="RibbonSplitButton"][aria-label="New contact"]'
             ))
         )
-        time.sleep(2)
+        wait_and_capture(driver, 2)
         new_contact_button.click()
         print("Clicked New Contact button")
         
-        time.sleep(3)
+        wait_and_capture(driver, 3)
         
         first_name, last_name = generate_random_name()
         
@@ -293,7 +395,7 @@ def create_new_contact(driver):
             email_input.send_keys(char)
             time.sleep(0.1)
         
-        time.sleep(2)
+        wait_and_capture(driver, 2)
         
         save_button = WebDriverWait(driver, 10).until(
             EC.element_to_be_clickable((
@@ -318,7 +420,7 @@ def find_and_click_contact(driver, email_to_find):
             EC.presence_of_element_located((By.CSS_SELECTOR, contact_selector))
         )
         
-        time.sleep(2)
+        wait_and_capture(driver, 2)
         contact.click()
         print(f"Found and clicked contact with email: {email_to_find}")
         return True
@@ -327,31 +429,57 @@ def find_and_click_contact(driver, email_to_find):
         return False
 
 def capture_network_requests(driver):
-    """Capture network requests from performance logs"""
+    """Capture network requests, returning watched ones plus at most CAPTURE_QUEUE_SIZE others"""
     try:
-        requests = []
-        # Get performance logs and extract network requests
-        logs = driver.get_log('performance')
-        for entry in logs:
+        buffer = driver.capture_buffer
+        sink = get_log_sink(driver)
+        completed = []
+        # Get performance logs and push network requests through the bounded buffer
+        for entry in driver.get_log('performance'):
             try:
                 # Parse log entry and extract network request data if available
                 data = json.loads(entry['message'])['message']
-                if (
-                    'Network.requestWillBeSent' == data['method']
-                    and data.get('params', {}).get('request')
-                ):
-                    request = data['params']['request']
-                    requests.append(request)
-                    # Log request to file for debugging purposes
-                    log_network_request(request, driver.network_log_file)
+                handle_network_event(driver, data, sink, completed)
             except:
                 continue
-        # Return all captured requests for further processing
+        # Watched requests are always returned; the rest is bounded by the queue size
+        requests = drain_capture_buffer(buffer, sink)
+        # Timing records are streamed to disk once a request finishes
+        save_capture_records(completed, driver.network_records_file)
+        print_capture_stats(driver.capture_buffer, driver.pending_records)
         return requests
     except Exception as e:
         print(f"Error capturing network requests: {str(e)}")
         return []
 
+def report_capture_timing(driver):
+    """Print timing analytics for the records captured so far and save the summary"""
+    try:
+        if not os.path.exists(driver.network_records_file):
+            print("No timing records captured yet")
+            return None
+        summary = compute_timing_summary(load_capture_records(driver.network_records_file))
+        print(format_timing_report(summary))
+        write_timing_summary(summary, os.path.splitext(driver.network_records_file)[0] + '_summary.json')
+        return summary
+    except Exception as e:
+        print(f"Error reporting capture timing: {str(e)}")
+        return None
+
+def report_capture_aggregate(driver):
+    """Print the rolled-up template counts and save the aggregate summary"""
+    if driver.aggregator is None:
+        return None
+    try:
+        summary = get_aggregate_summary(driver.aggregator)
+        print(format_aggregate_summary(summary))
+        print(f"Still in flight: {len(driver.pending_records['records'])}")
+        write_aggregate_summary(driver.aggregator, os.path.splitext(driver.network_records_file)[0] + '_aggregate.json')
+        return summary
+    except Exception as e:
+        print(f"Error reporting capture aggregate: {str(e)}")
+        return None
+
 def find_linkedin_request(captured_requests):
     """Find LinkedIn profile request in captured requests"""
     for request in captured_requests:
@@ -364,7 +492,7 @@ def click_linkedin_tab(driver):
     """Click LinkedIn tab and process captured requests"""
     try:
         # Start capturing network requests before clicking LinkedIn tab
-        driver.captured_requests = []
+        driver.captured_requests = deque(maxlen=CAPTURE_QUEUE_SIZE)
         print("\nStarted monitoring network requests...")
         
         # Find LinkedIn button and click it
@@ -376,17 +504,21 @@ def click_linkedin_tab(driver):
         )
         
         print("Found LinkedIn button, clicking...")
+        seen_before = get_capture_stats(driver.capture_buffer)['seen']
         linkedin_button.click()
         
         # Wait for requests to complete before processing
-        time.sleep(5)
+        wait_and_capture(driver, 5)
         
         # Capture all requests
         all_requests = capture_network_requests(driver)
-        print(f"Captured {len(all_requests)} network requests")
+        seen = get_capture_stats(driver.capture_buffer)['seen'] - seen_before
+        print(f"Captured {seen} network requests ({len(all_requests)} kept in memory)")
+        report_capture_timing(driver)
+        report_capture_aggregate(driver)
         
-        # Find LinkedIn request from captured requests
-        linkedin_request = find_linkedin_request(all_requests)
+        # LinkedIn requests drained while waiting were collected in captured_requests
+        linkedin_request = find_linkedin_request(list(driver.captured_requests) + all_requests)
         
         if linkedin_request:
             # Save to CSV if found
@@ -409,7 +541,7 @@ def click_linkedin_tab(driver):
 def check_contact_exists(driver, email_to_find):
     """Check if contact already exists"""
     try:
-        time.sleep(3)
+        wait_and_capture(driver, 3)
         
         contact_selector = f"div[aria-label*='{email_to_find}']"
         try:
@@ -429,9 +561,9 @@ def check_contact_exists(driver, email_to_find):
 def handle_people_page(driver, email):
     """Open and handle People page in new tab"""
     try:
-        time.sleep(6)
+        wait_and_capture(driver, 6)
         print("Starting network capture for People page...")
-        driver.captured_requests = []
+        driver.captured_requests = deque(maxlen=CAPTURE_QUEUE_SIZE)
         
         original_window = driver.current_window_handle
         
@@ -439,7 +571,7 @@ def handle_people_page(driver, email):
         for attempt in range(max_retries):
             try:
                 driver.execute_script("window.open('about:blank', '_blank');")
-                time.sleep(2)
+                wait_and_capture(driver, 2)
                 
                 new_window = [handle for handle in driver.window_handles if handle != original_window][0]
                 driver.switch_to.window(new_window)
@@ -451,9 +583,9 @@ def handle_people_page(driver, email):
                 print(f"Attempt {attempt + 1} failed: {str(e)}")
                 if attempt == max_retries - 1:
                     raise
-                time.sleep(3)
+                wait_and_capture(driver, 3)
         
-        time.sleep(10)
+        wait_and_capture(driver, 10)
         
         try:
             email_input = WebDriverWait(driver, 5).until(
@@ -464,7 +596,7 @@ def handle_people_page(driver, email):
             sign_in_button = driver.find_element(By.ID, "idSIButton9")
             sign_in_button.click()
             print("Signed in on People page")
-            time.sleep(5)
+            wait_and_capture(driver, 5)
         except:
             print("No need to sign in again, already authenticated")
         
@@ -477,7 +609,7 @@ def handle_people_page(driver, email):
                     new_contact_button = WebDriverWait(driver, 10).until(
                         EC.element_to_be_clickable((By.CSS_SELECTOR, '[data-automationid="splitbuttonprimary"]'))
                     )
-                    time.sleep(2)
+                    wait_and_capture(driver, 2)
                     new_contact_button.click()
                     print("Clicked New contact button")
                     break
@@ -485,19 +617,19 @@ def handle_people_page(driver, email):
                     print(f"Attempt {attempt + 1} to click New contact button failed")
                     if attempt == 2:
                         raise
-                    time.sleep(5)
+                    wait_and_capture(driver, 5)
             
             if not create_new_contact(driver):
                 raise Exception("Failed to create new contact")
             
-            time.sleep(5)
+            wait_and_capture(driver, 5)
         else:
             print("Contact already exists, proceeding to click...")
         
         if not find_and_click_contact(driver, CONTACT_EMAIL):
             raise Exception("Failed to find and click contact")
             
-        time.sleep(3)
+        wait_and_capture(driver, 3)
         print(f"Total requests captured so far: {len(driver.captured_requests)}")
         
         # Enable performance logging before clicking LinkedIn tab
@@ -510,7 +642,7 @@ def handle_people_page(driver, email):
             raise Exception("Failed to click LinkedIn tab")
         
         print("Waiting 15 seconds to see the result...")
-        time.sleep(15)
+        wait_and_capture(driver, 15)
         return True
         
     except Exception as e:
@@ -527,7 +659,7 @@ def login_sequence(driver, email, password):
         if not enter_email(driver, email):
             raise Exception("Failed to enter email")
         
-        time.sleep(3)
+        wait_and_capture(driver, 3)
         print("Proceeding to password entry...")
         
         if not enter_password(driver, password):
@@ -539,7 +671,7 @@ def login_sequence(driver, email, password):
         if not wait_for_successful_login(driver):
             raise Exception("Failed to confirm successful login")
         
-        time.sleep(5)
+        wait_and_capture(driver, 5)
         
         if not handle_people_page(driver, email):
             raise Exception("Failed to handle People page")
@@ -556,18 +688,19 @@ def main():
         
         driver.get(URLS['login'])
         print("Navigated to login page")
-        time.sleep(2)
+        wait_and_capture(driver, 2)
         
         if not login_sequence(driver, OUTLOOK_EMAIL, OUTLOOK_PASSWORD):
             raise Exception("Login sequence failed")
         
-        time.sleep(15)
+        wait_and_capture(driver, 15)
         print("Sequence completed")
         
     except Exception as e:
         print(f"An error occurred: {str(e)}")
     finally:
         time.sleep(10)
+        stop_performance_sampler(driver)
         driver.quit()
 
 if __name__ == "__main__":
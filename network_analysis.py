@@ -0,0 +1,227 @@
+# Description: Timing analytics over capture records written by main.py
+# Dependencies: numpy
+# Usage: python network_analysis.py <network_records_file.jsonl> [summary.json]
+
+import json
+import sys
+import numpy as np
+from capture_records import load_capture_records
+from url_templates import normalise_url
+
+PERCENTILES = (50, 90, 99)
+# Only the busiest endpoint templates are listed in the summary
+ENDPOINT_SUMMARY_LIMIT = 50
+
+def load_capture_arrays(records):
+    """Load completed capture records into columnar NumPy arrays"""
+    records = [
+        r for r in records
+        if r.get('start') is not None and r.get('end') is not None
+    ]
+    count = len(records)
+    start = np.fromiter((r['start'] for r in records), dtype=np.float64, count=count)
+    end = np.fromiter((r['end'] for r in records), dtype=np.float64, count=count)
+    size = np.fromiter((r.get('bytes') or 0 for r in records), dtype=np.float64, count=count)
+    hosts, host_idx = np.unique(
+        np.array([r.get('host', '') for r in records], dtype=object).astype(str),
+        return_inverse=True
+    )
+    # Group by URL template so IDs in paths and query values don't split endpoints
+    templates = {}
+    for r in records:
+        url = r.get('url', '')
+        if url not in templates:
+            templates[url] = normalise_url(url)
+    endpoints, endpoint_idx = np.unique(
+        np.array(
+            [f"{r.get('method', '')} {templates[r.get('url', '')]}" for r in records],
+            dtype=object
+        ).astype(str),
+        return_inverse=True
+    )
+    # URLs and initiators share one id space so dependency edges are integer lookups
+    url_ids = np.unique(
+        np.array(
+            [r.get('url', '') for r in records] + [r.get('initiator') or '' for r in records],
+            dtype=object
+        ).astype(str),
+        return_inverse=True
+    )[1].reshape(-1)
+    return {
+        'url': [r.get('url', '') for r in records],
+        'url_id': url_ids[:count],
+        'initiator_id': url_ids[count:],
+        'has_initiator': np.fromiter((bool(r.get('initiator')) for r in records), dtype=bool, count=count),
+        'start': start,
+        'end': end,
+        'latency': np.maximum(end - start, 0.0),
+        'bytes': size,
+        'hosts': hosts,
+        'host_idx': host_idx.reshape(-1),
+        'endpoints': endpoints,
+        'endpoint_idx': endpoint_idx.reshape(-1),
+    }
+
+def grouped_percentiles(values, group_idx, group_count, percentiles=PERCENTILES):
+    """Compute per-group percentiles with a single sort instead of a loop over groups"""
+    order = np.lexsort((values, group_idx))
+    sorted_values = values[order]
+    counts = np.bincount(group_idx, minlength=group_count)
+    offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    has_values = counts > 0
+    result = {}
+    for p in percentiles:
+        # Linear interpolation between the two closest ranks, like np.percentile
+        rank = (p / 100.0) * np.maximum(counts - 1, 0)
+        lo = np.floor(rank).astype(np.int64)
+        hi = np.minimum(lo + 1, np.maximum(counts - 1, 0))
+        frac = rank - lo
+        lo_values = sorted_values[np.where(has_values, offsets + lo, 0)]
+        hi_values = sorted_values[np.where(has_values, offsets + hi, 0)]
+        result[p] = np.where(has_values, lo_values + (hi_values - lo_values) * frac, np.nan)
+    return counts, result
+
+def summarize_groups(names, group_idx, arrays, limit=None):
+    """Build per-group latency and byte totals, optionally for the top groups by bytes only"""
+    group_count = len(names)
+    counts, pcts = grouped_percentiles(arrays['latency'], group_idx, group_count)
+    total_bytes = np.bincount(group_idx, weights=arrays['bytes'], minlength=group_count)
+    summary = []
+    # Busiest first: by bytes, then by request count
+    for i in np.lexsort((-counts, -total_bytes))[:limit]:
+        entry = {'name': str(names[i]), 'count': int(counts[i]), 'bytes': int(total_bytes[i])}
+        for p in PERCENTILES:
+            entry[f"p{p}_ms"] = round(float(pcts[p][i]) * 1000, 1)
+        summary.append(entry)
+    return summary
+
+def compute_concurrency(arrays, bins=50):
+    """Compute peak concurrency and in-flight request counts over time"""
+    start = np.sort(arrays['start'])
+    end = np.sort(arrays['end'])
+    if not len(start):
+        return {'peak': 0, 'timeline': []}
+
+    # Concurrency only changes at start times, so the peak is found there
+    active_at_starts = (
+        np.searchsorted(start, start, side='right')
+        - np.searchsorted(end, start, side='right')
+    )
+    origin = start[0]
+    points = np.linspace(origin, max(end[-1], origin), bins)
+    active = (
+        np.searchsorted(start, points, side='right')
+        - np.searchsorted(end, points, side='right')
+    )
+    return {
+        'peak': int(active_at_starts.max()),
+        'timeline': [
+            {'t_ms': round(float(t - origin) * 1000, 1), 'active': int(a)}
+            for t, a in zip(points, active)
+        ],
+    }
+
+def compute_critical_path(arrays):
+    """Find the dependency chain that ends with the last response
+
+    Each request depends on the latest-ending request for its initiator URL that
+    finished before it started. Requests without a known initiator fall back to
+    the request that finished last before they started.
+    """
+    count = len(arrays['end'])
+    if not count:
+        return []
+
+    by_end = np.argsort(arrays['end'], kind='stable')
+    sorted_end = arrays['end'][by_end]
+    end_rank = np.empty(count, dtype=np.int64)
+    end_rank[by_end] = np.arange(count)
+    # Number of requests that finished at or before each start time
+    start_rank = np.searchsorted(sorted_end, arrays['start'], side='right')
+
+    # Time-adjacency fallback for requests without an initiator
+    fallback = np.where(start_rank > 0, by_end[np.maximum(start_rank - 1, 0)], -1)
+
+    # Sort by (url, end) with a combined integer key, then find each initiator's
+    # latest response before the request started with a single searchsorted
+    stride = count + 1
+    url_id = arrays['url_id'].astype(np.int64)
+    keys = url_id * stride + end_rank + 1
+    by_key = np.argsort(keys, kind='stable')
+    sorted_keys = keys[by_key]
+    initiator_id = arrays['initiator_id'].astype(np.int64)
+    pos = np.searchsorted(sorted_keys, initiator_id * stride + start_rank, side='right') - 1
+    candidate = by_key[np.maximum(pos, 0)]
+    matched = (pos >= 0) & (url_id[candidate] == initiator_id)
+    by_initiator = np.where(matched, candidate, -1)
+
+    predecessor = np.where(arrays['has_initiator'], by_initiator, fallback)
+
+    origin = arrays['start'].min()
+    path = []
+    current = int(by_end[-1])
+    seen = set()
+    while current >= 0 and current not in seen:
+        seen.add(current)
+        path.append({
+            'url': arrays['url'][current],
+            'start_ms': round(float(arrays['start'][current] - origin) * 1000, 1),
+            'end_ms': round(float(arrays['end'][current] - origin) * 1000, 1),
+        })
+        current = int(predecessor[current])
+    path.reverse()
+    return path
+
+def compute_timing_summary(records):
+    """Compute the machine-readable timing summary for a capture run"""
+    arrays = load_capture_arrays(records)
+    duration = float(arrays['end'].max() - arrays['start'].min()) if len(arrays['start']) else 0.0
+    return {
+        'requests': int(len(arrays['start'])),
+        'total_bytes': int(arrays['bytes'].sum()),
+        'duration_ms': round(duration * 1000, 1),
+        'hosts': summarize_groups(arrays['hosts'], arrays['host_idx'], arrays),
+        'endpoint_count': int(len(arrays['endpoints'])),
+        'endpoints': summarize_groups(
+            arrays['endpoints'], arrays['endpoint_idx'], arrays, limit=ENDPOINT_SUMMARY_LIMIT
+        ),
+        'concurrency': compute_concurrency(arrays),
+        'critical_path': compute_critical_path(arrays),
+    }
+
+def format_timing_report(summary, top=10):
+    """Format a compact text report from a timing summary"""
+    lines = [
+        f"Requests: {summary['requests']}  Bytes: {summary['total_bytes']}  "
+        f"Duration: {summary['duration_ms']} ms  Peak concurrency: {summary['concurrency']['peak']}",
+        "",
+        f"{'Host':<50} {'Count':>6} {'Bytes':>10} {'p50':>8} {'p90':>8} {'p99':>8}",
+    ]
+    for entry in summary['hosts'][:top]:
+        lines.append(
+            f"{entry['name'][:50]:<50} {entry['count']:>6} {entry['bytes']:>10} "
+            f"{entry['p50_ms']:>8} {entry['p90_ms']:>8} {entry['p99_ms']:>8}"
+        )
+    lines.append("")
+    lines.append(f"Critical path ({len(summary['critical_path'])} requests):")
+    for step in summary['critical_path']:
+        lines.append(f"  {step['start_ms']:>9} -> {step['end_ms']:>9} ms  {step['url'][:100]}")
+    return "\n".join(lines)
+
+def write_timing_summary(summary, summary_file):
+    """Write the timing summary as JSON"""
+    try:
+        with open(summary_file, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2)
+        print(f"Timing summary saved to: {summary_file}")
+    except Exception as e:
+        print(f"Error saving timing summary: {str(e)}")
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python network_analysis.py <network_records_file.jsonl> [summary.json]")
+        sys.exit(1)
+    summary = compute_timing_summary(load_capture_records(sys.argv[1]))
+    print(format_timing_report(summary))
+    if len(sys.argv) > 2:
+        write_timing_summary(summary, sys.argv[2])
@@ -3,6 +3,7 @@
 # Usage: python network_test.py
 # Note: Make sure to update the TEST_BASE_URL and TEST_PRICING_URL with your desired URLs
 # Note: This script will save network logs to a file named test_network_logs_<timestamp>.txt
+# Note: Timing records are saved next to it as test_network_records_<timestamp>.jsonl
 # Note: You need to have Chrome installed on your system
 # Note: You need to have the ChromeDriver installed on your system
 # Note: You need to have the .env file with the required environment variables
@@ -14,16 +15,29 @@ import time
 import os
 from datetime import datetime
 import json
+from collections import deque
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.by import By
 from dotenv import load_dotenv
+from capture_records import (
+    create_pending_records, update_capture_records, take_evicted_records,
+    save_capture_records, get_records_filepath
+)
+from capture_buffer import (
+    create_capture_buffer, enqueue_request, drain_capture_buffer, get_capture_stats,
+    load_capture_settings, print_capture_stats
+)
 
 load_dotenv()
 
 TEST_BASE_URL = os.getenv('TEST_BASE_URL', 'https://anything.com')
 TEST_PRICING_URL = os.getenv('TEST_PRICING_URL', 'https://anything.com/anything')
 
+# Same capture buffer settings as config.py (not imported, it requires the Outlook credentials)
+CAPTURE_SETTINGS = load_capture_settings()
+TEST_WATCHED_URL_PATTERNS = [p for p in os.getenv('TEST_WATCHED_URL_PATTERNS', '').split(',') if p]
+
 def get_log_filepath():
     """Get filepath for network logs"""
     base_dir = "/home/dev/outlook-cookie-automation"
@@ -33,17 +47,23 @@ def get_log_filepath():
 
 def log_request(request_data, log_file):
     """Log request details to file"""
+    log_requests([request_data], log_file)
+
+def log_requests(requests, log_file):
+    """Log a batch of requests to file with a single open"""
     try:
+        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         with open(log_file, 'a', encoding='utf-8') as f:
-            f.write("\n" + "="*80 + "\n")
-            f.write(f"Timestamp: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-            f.write(f"URL: {request_data.get('url')}\n")
-            f.write(f"Method: {request_data.get('method')}\n")
-            f.write("Headers:\n")
-            for key, value in request_data.get('headers', {}).items():
-                f.write(f"{key}: {value}\n")
-            f.write("="*80 + "\n")
-        print(f"Logged request: {request_data.get('url')}")
+            for request_data in requests:
+                f.write("\n" + "="*80 + "\n")
+                f.write(f"Timestamp: {timestamp}\n")
+                f.write(f"URL: {request_data.get('url')}\n")
+                f.write(f"Method: {request_data.get('method')}\n")
+                f.write("Headers:\n")
+                for key, value in request_data.get('headers', {}).items():
+                    f.write(f"{key}: {value}\n")
+                f.write("="*80 + "\n")
+        print(f"Logged {len(requests)} requests")
     except Exception as e:
         print(f"Error logging request: {str(e)}")
 
@@ -69,8 +89,17 @@ def setup_network_monitoring():
     
     driver.set_page_load_timeout(30)
     
-    driver.captured_requests = []
+    # Only the most recent requests are kept in memory; everything else is in the log file
+    driver.captured_requests = deque(maxlen=CAPTURE_SETTINGS['queue_size'])
+    driver.capture_buffer = create_capture_buffer(
+        max_size=CAPTURE_SETTINGS['queue_size'],
+        policy=CAPTURE_SETTINGS['policy'],
+        sample_rate=CAPTURE_SETTINGS['sample_rate'],
+        watch_patterns=TEST_WATCHED_URL_PATTERNS
+    )
     driver.log_file = get_log_filepath()
+    driver.records_file = get_records_filepath(driver.log_file)
+    driver.pending_records = create_pending_records(CAPTURE_SETTINGS['pending_max'])
     print(f"Network logs will be saved to: {driver.log_file}")
     
     driver.execute_cdp_cmd('Network.enable', {})
@@ -101,19 +130,27 @@ def wait_for_page_load(driver, url, timeout=30):
 def get_performance_logs(driver):
     """Extract network requests from performance logs"""
     try:
-        logs = driver.get_log('performance')
-        for entry in logs:
+        sink = lambda batch: log_requests(batch, driver.log_file)
+        completed = []
+        for entry in driver.get_log('performance'):
             try:
                 data = json.loads(entry['message'])['message']
+                record = update_capture_records(driver.pending_records, data)
+                # No aggregation here, evictions are only counted
+                take_evicted_records(driver.pending_records)
+                if record:
+                    completed.append(record)
                 if (
                     'Network.requestWillBeSent' == data['method']
                     and data.get('params', {}).get('request')
                 ):
-                    request = data['params']['request']
-                    log_request(request, driver.log_file)
-                    driver.captured_requests.append(request)
+                    enqueue_request(driver.capture_buffer, data['params']['request'], sink)
             except:
                 continue
+        driver.captured_requests.extend(drain_capture_buffer(driver.capture_buffer, sink))
+        # Timing records let capture_diff.py report latency changes between runs
+        save_capture_records(completed, driver.records_file)
+        print_capture_stats(driver.capture_buffer, driver.pending_records)
     except Exception as e:
         print(f"Error getting performance logs: {str(e)}")
 
@@ -128,13 +165,13 @@ def test_network_capture():
         if wait_for_page_load(driver, TEST_BASE_URL):
             time.sleep(3)
             get_performance_logs(driver)
-            print(f"Captured {len(driver.captured_requests)} requests")
+            print(f"Captured {get_capture_stats(driver.capture_buffer)['seen']} requests")
         
         print(f"\nTesting pricing page: {TEST_PRICING_URL}")
         if wait_for_page_load(driver, TEST_PRICING_URL):
             time.sleep(3)
             get_performance_logs(driver)
-            print(f"Total captured requests: {len(driver.captured_requests)}")
+            print(f"Total captured requests: {get_capture_stats(driver.capture_buffer)['seen']}")
         
         print(f"\nAll requests have been logged to: {driver.log_file}")
         
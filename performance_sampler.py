@@ -0,0 +1,111 @@
+import time
+from capture_records import save_capture_records
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+SAMPLED_METRICS = (
+    'JSHeapUsedSize', 'JSHeapTotalSize', 'Nodes', 'Documents', 'JSEventListeners',
+    'LayoutDuration', 'RecalcStyleDuration', 'ScriptDuration', 'TaskDuration',
+)
+
+def enable_performance_metrics(driver):
+    """Enable the CDP Performance domain with timestamps matching network events"""
+    # timeTicks puts the Timestamp metric on the same monotonic clock as Network.* events
+    driver.execute_cdp_cmd('Performance.enable', {'timeDomain': 'timeTicks'})
+
+def get_browser_rss(driver):
+    """Get resident memory of chromedriver and all browser processes, if psutil is available"""
+    if psutil is None:
+        return None
+    try:
+        root = psutil.Process(driver.service.process.pid)
+        processes = [root] + root.children(recursive=True)
+        total = 0
+        for process in processes:
+            try:
+                total += process.memory_info().rss
+            except psutil.Error:
+                continue
+        return total
+    except Exception:
+        return None
+
+def ensure_performance_metrics(driver, sampler):
+    """Re-enable the Performance domain when the active window changes"""
+    # CDP domains are enabled per target and execute_cdp_cmd goes to the current window
+    handle = driver.current_window_handle
+    if handle != sampler.get('window'):
+        enable_performance_metrics(driver)
+        sampler['window'] = handle
+
+def sample_performance_metrics(driver, sampler):
+    """Take one resource sample from Performance.getMetrics and the process table"""
+    result = driver.execute_cdp_cmd('Performance.getMetrics', {})
+    metrics = {m['name']: m['value'] for m in result.get('metrics', [])}
+    if not metrics and not sampler['warned_empty']:
+        print("Warning: Performance.getMetrics returned no metrics, is the Performance domain enabled?")
+        sampler['warned_empty'] = True
+    sample = {
+        'kind': 'metrics',
+        'timestamp': metrics.get('Timestamp'),
+        'wall_time': time.time(),
+        'rss_bytes': get_browser_rss(driver),
+    }
+    for name in SAMPLED_METRICS:
+        sample[name] = metrics.get(name)
+    return sample
+
+def get_next_sample_time(driver):
+    """Get the monotonic time the next sample is due, or None if sampling is off"""
+    sampler = getattr(driver, 'performance_sampler', None)
+    return sampler['next_due'] if sampler else None
+
+def sample_performance_if_due(driver):
+    """Write a resource sample if the sampling interval has elapsed"""
+    sampler = getattr(driver, 'performance_sampler', None)
+    if not sampler or time.monotonic() < sampler['next_due']:
+        return False
+    # Runs on the capture thread: the WebDriver is not safe to share across threads
+    try:
+        ensure_performance_metrics(driver, sampler)
+        save_capture_records([sample_performance_metrics(driver, sampler)], sampler['records_file'])
+    except Exception as e:
+        print(f"Error sampling performance metrics: {str(e)}")
+    sampler['next_due'] = time.monotonic() + sampler['interval']
+    return True
+
+def start_performance_sampler(driver, records_file, interval=1.0):
+    """Start resource sampling, taken from the capture loop while the session waits"""
+    if interval <= 0:
+        print(f"Invalid performance sample interval: {interval}, must be greater than 0")
+        return False
+    try:
+        enable_performance_metrics(driver)
+        driver.performance_sampler = {
+            'records_file': records_file,
+            'interval': interval,
+            'next_due': time.monotonic(),
+            'window': driver.current_window_handle,
+            'warned_empty': False,
+        }
+        if psutil is None:
+            print("psutil not installed, process RSS will not be sampled")
+        print(f"Performance sampling every {interval}s to: {records_file}")
+        return True
+    except Exception as e:
+        print(f"Failed to start performance sampler: {str(e)}")
+        return False
+
+def stop_performance_sampler(driver):
+    """Stop resource sampling and disable the Performance domain"""
+    sampler = getattr(driver, 'performance_sampler', None)
+    if not sampler:
+        return
+    driver.performance_sampler = None
+    try:
+        driver.execute_cdp_cmd('Performance.disable', {})
+    except Exception as e:
+        print(f"Error disabling performance metrics: {str(e)}")
@@ -0,0 +1,32 @@
+import re
+from urllib.parse import urlsplit
+
+DIGIT_RE = re.compile(r'\d')
+UUID_RE = re.compile(r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$', re.IGNORECASE)
+HEX_RE = re.compile(r'^[0-9a-f]{12,}$', re.IGNORECASE)
+TOKEN_RE = re.compile(r'^(?=.*\d)[A-Za-z0-9_\-=.]{20,}$')
+
+def normalise_segment(segment):
+    """Replace ID-like path segments with placeholders"""
+    # Every placeholder pattern needs a digit, which rules out most segments cheaply
+    if not DIGIT_RE.search(segment):
+        return segment
+    if segment.isdigit():
+        return '{id}'
+    if UUID_RE.match(segment):
+        return '{uuid}'
+    if HEX_RE.match(segment):
+        return '{hash}'
+    if TOKEN_RE.match(segment):
+        return '{token}'
+    return segment
+
+def normalise_url(url):
+    """Turn a URL into a template without IDs or query values"""
+    parts = urlsplit(url)
+    path = '/'.join(normalise_segment(s) for s in parts.path.split('/'))
+    template = f"{parts.netloc}{path}"
+    keys = sorted({pair.split('=', 1)[0] for pair in parts.query.split('&') if pair})
+    if keys:
+        template += '?' + '&'.join(keys)
+    return template